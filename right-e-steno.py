@@ -17,26 +17,29 @@ Right E steno theory.
 """
 
 from __future__ import annotations
-import bisect
+import functools
 import re
+import types
 import typing
 import sys
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 
 LONGEST_KEY = 10
 
 
-@dataclass
+@dataclass(frozen=True, eq=False)
 class Alt:
-    choices: list[Pat]
+    __slots__ = ("choices",)
+    choices: tuple[Pat, ...]
 
     def __repr__(self) -> str:
         return "alt(" + ", ".join(repr(c) for c in self.choices) + ")"
 
 
-@dataclass
+@dataclass(frozen=True, eq=False)
 class Seq:
-    elements: list[Pat]
+    __slots__ = ("elements",)
+    elements: tuple[Pat, ...]
 
     def __repr__(self) -> str:
         return "seq(" + ", ".join(repr(e) for e in self.elements) + ")"
@@ -44,6 +47,13 @@ class Seq:
 
 Pat = typing.Union[Alt, Seq, str]
 
+# Structurally identical pats are interned, so that they share identity (and
+# hence memoized results) no matter how they were built. This also means that
+# Alts and Seqs can be compared and hashed by identity, which is much cheaper
+# than doing so structurally.
+_ALT_CACHE: dict[tuple[Pat, ...], Alt] = {}
+_SEQ_CACHE: dict[tuple[Pat, ...], Seq] = {}
+
 
 def alt(*args: Pat) -> Pat:
     """Matches one of the given choices.
@@ -56,6 +66,9 @@ def alt(*args: Pat) -> Pat:
 
     >>> alt(alt('b', 'c'), 'd')
     alt('b', 'c', 'd')
+
+    >>> alt('b', 'c') is alt('b', 'c')
+    True
     """
     choices = []
     for a in args:
@@ -65,7 +78,11 @@ def alt(*args: Pat) -> Pat:
             choices.append(a)
     if len(choices) == 1:
         return choices[0]
-    return Alt(choices)
+    key = tuple(choices)
+    ret = _ALT_CACHE.get(key)
+    if ret is None:
+        ret = _ALT_CACHE[key] = Alt(key)
+    return ret
 
 
 def seq(*args: Pat) -> Pat:
@@ -88,7 +105,11 @@ def seq(*args: Pat) -> Pat:
             elements.append(a)
     if len(elements) == 1:
         return elements[0]
-    return Seq(elements)
+    key = tuple(elements)
+    ret = _SEQ_CACHE.get(key)
+    if ret is None:
+        ret = _SEQ_CACHE[key] = Seq(key)
+    return ret
 
 
 def compile_pat_part(patstr: str) -> tuple[Pat, str]:
@@ -100,27 +121,29 @@ def compile_pat_part(patstr: str) -> tuple[Pat, str]:
     >>> compile_pat_part("d)e")
     ('d', 'e')
     """
-    ret = alt()
-    current_seq = seq()
+    # Collect elements and choices in lists, and only build the pats once
+    # they are complete, so that incomplete ones are not built (and interned).
+    choices = []
+    elements = []
     while patstr:
         if patstr[0] == "(":
-            inner_pat, remaining_patstr = compile_pat_part(patstr[1:])
-            current_seq = seq(current_seq, inner_pat)
-            patstr = remaining_patstr
+            inner_pat, patstr = compile_pat_part(patstr[1:])
+            elements.append(inner_pat)
         elif patstr[0] == "|":
-            ret = alt(ret, current_seq)
-            current_seq = seq()
+            choices.append(seq(*elements))
+            elements = []
             patstr = patstr[1:]
         elif patstr[0] == ")":
             patstr = patstr[1:]
             break
         else:
-            current_seq = seq(current_seq, patstr[0])
+            elements.append(patstr[0])
             patstr = patstr[1:]
-    ret = alt(ret, current_seq)
-    return ret, patstr
+    choices.append(seq(*elements))
+    return alt(*choices), patstr
 
 
+@functools.lru_cache(maxsize=None)
 def compile_pat(patstr: str) -> Pat:
     """Compile into a pattern.
 
@@ -138,159 +161,265 @@ def compile_pat(patstr: str) -> Pat:
     return pat
 
 
-@dataclass
-class Cursor:
-    word_list: list[str] = field(repr=False)
-    matching_range: range
-    letters_read: str = ""
-    score: int = 0
-
-    def on_word(self) -> bool:
-        """Return whether letters_read is in the word list."""
-        return self.word_list[self.matching_range.start] == self.letters_read
-
-    def advance_any_letter(self, letters: str, /, add_score=0) -> list:
-        """Advance by any of the letters in the string.
-
-        >>> word_list = ['a', 'ab', 'ac', 'ad', 'b']
-        >>> cursor_start = Cursor(word_list, range(len(word_list)))
-        >>> cursor_a = cursor_start.advance_any_letter('a', add_score=10)
-        >>> cursor_a
-        [Cursor(matching_range=range(0, 4), letters_read='a', score=10)]
-
-        >>> cursor_bc = cursor_a[0].advance_any_letter('bc', add_score=20)
-        >>> cursor_bc
-        [Cursor(matching_range=range(1, 2), letters_read='ab', score=30),
-         Cursor(matching_range=range(2, 3), letters_read='ac', score=30)]
-        """
-        ret = []
-        for letter in list(letters):
-            start_needle = self.letters_read + letter
-            stop_needle = self.letters_read + chr(ord(letter) + 1)
-            start = bisect.bisect_left(
-                self.word_list,
-                start_needle,
-                lo=self.matching_range.start,
-                hi=self.matching_range.stop,
-            )
-            stop = bisect.bisect_left(
-                self.word_list,
-                stop_needle,
-                lo=self.matching_range.start,
-                hi=self.matching_range.stop,
-            )
-            if start != stop:
-                ret.append(
-                    Cursor(
-                        self.word_list,
-                        range(start, stop),
-                        start_needle,
-                        self.score + add_score,
-                    )
-                )
-        return ret
+_NO_CHILDREN: typing.Mapping[str, TrieNode] = types.MappingProxyType({})
+"""Shared by all leaves of a trie, so that they do not each need an empty dict.
+"""
 
-    def advance(self, pat: Pat) -> list:
-        """Advance by the given pattern.
-
-        Returned cursors may overlap:
-
-        >>> word_list = ['a', 'ab', 'ac', 'ad', 'b']
-        >>> cursor = Cursor(word_list, range(len(word_list)))
-        >>> cursor.advance(seq('a', alt(seq(), 'b', 'c')))
-        [Cursor(matching_range=range(0, 4), letters_read='a', score=0),
-         Cursor(matching_range=range(1, 2), letters_read='ab', score=0),
-         Cursor(matching_range=range(2, 3), letters_read='ac', score=0)]
-
-        The ! matches 0 to 2 vowels, with a score of 10 per vowel.
-
-        >>> word_list = ['c', 'cac', 'cc', 'ceic', 'couac']
-        >>> cursor = Cursor(word_list, range(len(word_list)))
-        >>> cursor.advance(seq('c', '!', 'c'))
-        [Cursor(matching_range=range(2, 3), letters_read='cc', score=0),
-         Cursor(matching_range=range(1, 2), letters_read='cac', score=10),
-         Cursor(matching_range=range(3, 4), letters_read='ceic', score=20)]
-
-        The E optionally matches 'e', with a score of 100 if it does.
-
-        >>> word_list = ['c', 'ce']
-        >>> cursor = Cursor(word_list, range(len(word_list)))
-        >>> cursor.advance(seq('c', 'E'))
-        [Cursor(matching_range=range(0, 2), letters_read='c', score=0),
-         Cursor(matching_range=range(1, 2), letters_read='ce', score=100)]
-
-        The W optionally matches one of 'aeiouw', with a score of 1 if it does.
-
-        >>> word_list = ['c', 'ce', 'cf', 'cw']
-        >>> cursor = Cursor(word_list, range(len(word_list)))
-        >>> cursor.advance(seq('c', 'W'))
-        [Cursor(matching_range=range(0, 4), letters_read='c', score=0),
-         Cursor(matching_range=range(1, 2), letters_read='ce', score=1),
-         Cursor(matching_range=range(3, 4), letters_read='cw', score=1)]
-
-        All lowercase vowels match themselves. All lowercase consonants match
-        single or double versions of themselves.
-
-        >>> word_list = ['aab', 'aabb', 'ab', 'abb']
-        >>> cursor = Cursor(word_list, range(len(word_list)))
-        >>> cursor.advance(seq('a', 'b'))
-        [Cursor(matching_range=range(2, 4), letters_read='ab', score=0),
-         Cursor(matching_range=range(3, 4), letters_read='abb', score=0)]
-        """
-        ret = []
-        if isinstance(pat, str):
-            if pat == "!":
-                no_vowels = [self]
-                one_vowel = self.advance_any_letter("aeiou", add_score=10)
-                two_vowels = []
-                for ov in one_vowel:
-                    two_vowels.extend(ov.advance_any_letter("aeiou", add_score=10))
-                return no_vowels + one_vowel + two_vowels
-            if pat == "E":
-                return [self] + self.advance_any_letter("e", add_score=100)
-            if pat == "W":
-                return [self] + self.advance_any_letter("aeiouw", add_score=1)
-            one_letter = self.advance_any_letter(pat)
-            if not one_letter:
-                return []
-            if pat in "aeiou":
-                return one_letter
-            return one_letter + one_letter[0].advance_any_letter(pat)
-        if isinstance(pat, Alt):
-            new_cursors = []
-            for choice in pat.choices:
-                new_cursors.extend(self.advance(choice))
-            return new_cursors
-        if isinstance(pat, Seq):
-            old_cursors = [self]
-            new_cursors = []
-            for e in pat.elements:
-                for c in old_cursors:
-                    new_cursors.extend(c.advance(e))
-                old_cursors, new_cursors = new_cursors, []
-            return old_cursors
-        raise ValueError("unexpected type of pat")
-
-
-def advance_flatten(cursors: list[Cursor], pat: Pat) -> list[Cursor]:
-    """Convenience function to advance a list of cursors."""
+
+class TrieNode:
+    """A node in a trie of words. Each node corresponds to a prefix of one or
+    more words, and holds the word equal to that prefix, if there is one.
+    """
+
+    __slots__ = ("children", "word")
+
+    def __init__(self) -> None:
+        self.children: typing.Mapping[str, TrieNode] = _NO_CHILDREN
+        self.word: typing.Optional[str] = None
+
+
+def build_trie(words: list[str]) -> TrieNode:
+    """Build a trie of the given words.
+
+    >>> root = build_trie(['a', 'ab', 'b'])
+    >>> list(root.children)
+    ['a', 'b']
+    >>> root.children['a'].children['b'].word
+    'ab'
+    """
+    root = TrieNode()
+    # Sort the words, so that each node's children are in alphabetical order.
+    for w in sorted(words):
+        node = root
+        for letter in w:
+            child = node.children.get(letter)
+            if child is None:
+                if node.children is _NO_CHILDREN:
+                    node.children = {}
+                child = node.children[letter] = TrieNode()
+            node = child
+        node.word = w
+    return root
+
+
+Cursor = typing.Tuple[TrieNode, int]
+"""A position in a trie, and a score. Cursors are plain tuples, since lookups
+create many of them. The letters read to reach a position are not kept: the
+node identifies them, and the word they spell, if any, is stored in the node.
+"""
+
+
+def advance_any_letter(node: TrieNode, letters: str, score: int) -> list[Cursor]:
+    """Advance by any of the letters in the string, which must be in
+    alphabetical order.
+
+    >>> root = build_trie(['a', 'ab', 'ac', 'ad', 'b'])
+    >>> [(n.word, s) for n, s in advance_any_letter(root, 'ac', 10)]
+    [('a', 10)]
+
+    >>> root = build_trie(['a', 'b', 'c'])
+    >>> [(n.word, s) for n, s in advance_any_letter(root, 'b', 0)]
+    [('b', 0)]
+    """
+    children = node.children
+    if len(children) <= len(letters):
+        # Most nodes have only a few children, so scan them instead of probing
+        # for each letter. Children are in alphabetical order (see
+        # build_trie()), so if the letters are too, the order of the returned
+        # cursors is the same either way.
+        return [
+            (child, score) for letter, child in children.items() if letter in letters
+        ]
     ret = []
-    for c in cursors:
-        ret.extend(c.advance(pat))
+    for letter in letters:
+        child = children.get(letter)
+        if child is not None:
+            ret.append((child, score))
     return ret
 
 
+_ADVANCE_MEMO_LIMIT = 1 << 18
+_advance_memo: dict[tuple[TrieNode, Pat], list[Cursor]] = {}
+"""Memoized results of advancing nodes by shared pats (see _advancer())."""
+
+
+Advancer = typing.Callable[[TrieNode], typing.List[Cursor]]
+
+
+@functools.lru_cache(maxsize=None)
+def _advancer(pat: Pat) -> Advancer:
+    """Compile the given pat into a function that advances a node by it.
+
+    The function is specialized to the pat: each part of the pat is dispatched
+    on once, here, instead of every time a node is advanced by it. Pats are
+    interned, so this only happens once per pat.
+
+    Only pats that are shared between many larger pats are memoized: the
+    special pats ("!", "E", and "W") and all Alts and Seqs. Single letters are
+    cheap enough to recompute.
+    """
+    if isinstance(pat, str) and pat not in ("!", "E", "W"):
+        return _letter_advancer(pat)
+    advance_uncached = _compile_advancer(pat)
+
+    def advance_memoized(node: TrieNode) -> list[Cursor]:
+        key = (node, pat)
+        ret = _advance_memo.get(key)
+        if ret is None:
+            if len(_advance_memo) >= _ADVANCE_MEMO_LIMIT:
+                _advance_memo.clear()
+            ret = _advance_memo[key] = advance_uncached(node)
+        return ret
+
+    return advance_memoized
+
+
+def _letter_advancer(letter: str) -> Advancer:
+    if letter in "aeiou":
+
+        def advance_vowel(node: TrieNode) -> list[Cursor]:
+            child = node.children.get(letter)
+            if child is None:
+                return []
+            return [(child, 0)]
+
+        return advance_vowel
+
+    def advance_consonant(node: TrieNode) -> list[Cursor]:
+        child = node.children.get(letter)
+        if child is None:
+            return []
+        # Consonants may be doubled.
+        double = child.children.get(letter)
+        if double is None:
+            return [(child, 0)]
+        return [(child, 0), (double, 0)]
+
+    return advance_consonant
+
+
+def _advance_vowels(node: TrieNode) -> list[Cursor]:
+    no_vowels = [(node, 0)]
+    one_vowel = advance_any_letter(node, "aeiou", 10)
+    two_vowels = []
+    for n, score in one_vowel:
+        two_vowels.extend(advance_any_letter(n, "aeiou", score + 10))
+    return no_vowels + one_vowel + two_vowels
+
+
+def _compile_advancer(pat: Pat) -> Advancer:
+    if pat == "!":
+        return _advance_vowels
+    if pat == "E":
+        return lambda node: [(node, 0)] + advance_any_letter(node, "e", 100)
+    if pat == "W":
+        return lambda node: [(node, 0)] + advance_any_letter(node, "aeiouw", 1)
+    if isinstance(pat, Alt):
+        choice_steps = [_advancer(choice) for choice in pat.choices]
+
+        def advance_alt(node: TrieNode) -> list[Cursor]:
+            ret = []
+            for step in choice_steps:
+                ret.extend(step(node))
+            return ret
+
+        return advance_alt
+    if isinstance(pat, Seq):
+        if not pat.elements:
+            return lambda node: [(node, 0)]
+        first_step = _advancer(pat.elements[0])
+        rest_steps = [_advancer(element) for element in pat.elements[1:]]
+
+        def advance_seq(node: TrieNode) -> list[Cursor]:
+            # The scores from the first step are already relative to node, so
+            # its cursors can be used as they are.
+            cursors = first_step(node)
+            for step in rest_steps:
+                cursors = [
+                    (n2, score + score2)
+                    for n, score in cursors
+                    for n2, score2 in step(n)
+                ]
+            return cursors
+
+        return advance_seq
+    raise ValueError("unexpected type of pat")
+
+
+def advance_flatten(cursors: typing.Iterable[Cursor], pat: Pat) -> list[Cursor]:
+    """Advance each of the given cursors by the given pattern.
+
+    Returned cursors may overlap:
+
+    >>> cursors = [(build_trie(['a', 'ab', 'ac', 'ad', 'b']), 0)]
+    >>> pat = seq('a', alt(seq(), 'b', 'c'))
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, pat)]
+    [('a', 0), ('ab', 0), ('ac', 0)]
+
+    The ! matches 0 to 2 vowels, with a score of 10 per vowel.
+
+    >>> cursors = [(build_trie(['c', 'cac', 'cc', 'ceic', 'couac']), 0)]
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, seq('c', '!', 'c'))]
+    [('cc', 0), ('cac', 10), ('ceic', 20)]
+
+    The E optionally matches 'e', with a score of 100 if it does.
+
+    >>> cursors = [(build_trie(['c', 'ce']), 0)]
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, seq('c', 'E'))]
+    [('c', 0), ('ce', 100)]
+
+    The W optionally matches one of 'aeiouw', with a score of 1 if it does.
+
+    >>> cursors = [(build_trie(['c', 'ce', 'cf', 'cw']), 0)]
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, seq('c', 'W'))]
+    [('c', 0), ('ce', 1), ('cw', 1)]
+
+    All lowercase vowels match themselves. All lowercase consonants match
+    single or double versions of themselves.
+
+    >>> cursors = [(build_trie(['aab', 'aabb', 'ab', 'abb']), 0)]
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, seq('a', 'b'))]
+    [('ab', 0), ('abb', 0)]
+    """
+    step = _advancer(pat)
+    return [(n2, score + score2) for n, score in cursors for n2, score2 in step(n)]
+
+
 def get_word(cursors: list[Cursor]) -> typing.Optional[str]:
     """Return the lowest-score word."""
     best_word = None
     best_score = sys.maxsize
-    for c in cursors:
-        if c.on_word() and c.score < best_score:
-            best_word = c.letters_read
-            best_score = c.score
+    for node, score in cursors:
+        if node.word is not None and score < best_score:
+            best_word = node.word
+            best_score = score
     return best_word
 
 
+def dedup_cursors(cursors: typing.Iterable[Cursor]) -> list[Cursor]:
+    """Keep only the first lowest-score cursor at each node.
+
+    Any word reachable from a dropped cursor is also reachable from the kept
+    one, with no higher score and from an earlier position, so the word that
+    get_word() eventually chooses does not change.
+
+    >>> root = build_trie(['a', 'b'])
+    >>> a, b = root.children['a'], root.children['b']
+    >>> dedup_cursors([(a, 2), (b, 1), (a, 0), (a, 0)]) == [(b, 1), (a, 0)]
+    True
+    """
+    best: dict[TrieNode, int] = {}
+    for node, score in cursors:
+        best_score = best.get(node)
+        if best_score is None:
+            best[node] = score
+        elif score < best_score:
+            # Move the node to this position.
+            del best[node]
+            best[node] = score
+    return list(best.items())
+
+
 def make_dict(s: str) -> dict[str, str]:
     ret = {}
     for k, v in (kv.split("=") for kv in s.split()):
@@ -383,23 +512,46 @@ D=d TD=th
 Z=e
 """
 )
-# F and R need special handling.
-for chord, pat in list(right_chord_to_pat.items()):
-    F_prioritize_v = chord == "Z"
-    F_can_be_s = set(chord).intersection("PBLGT")
-    R_can_be_l = set(chord).intersection("PB")
-    FR_can_be_m = set(chord).intersection("PBLG") not in [set("PL"), set("BG")]
-    FR_can_be_n = set(chord).intersection("PBLG") == set("BG")
 
-    F_pat = alt("v", "f") if F_prioritize_v else alt("f", "v")
+
+@functools.lru_cache(maxsize=None)
+def compile_f_and_r(
+    F_prioritize_v: bool,
+    F_can_be_s: bool,
+    R_can_be_l: bool,
+    FR_can_be_m: bool,
+    FR_can_be_n: bool,
+) -> tuple[Pat, Pat, Pat]:
+    """Return the pats for F, R, and FR on the right bank. Only a few
+    combinations of flags occur, so each is compiled once.
+
+    >>> compile_f_and_r(False, True, False, False, True)
+    (alt('f', 'v', 's'), 'r',
+     alt(seq(alt('f', 'v', 's'), '!', 'r'), seq('r', '!', alt('f', 'v', 's')), 'n'))
+    """
+    F_choices = ["v", "f"] if F_prioritize_v else ["f", "v"]
     if F_can_be_s:
-        F_pat = alt(F_pat, "s")
+        F_choices.append("s")
+    F_pat = alt(*F_choices)
     R_pat = alt("r", "l") if R_can_be_l else "r"
-    FR_pat = alt(seq(F_pat, "!", R_pat), seq(R_pat, "!", F_pat))
+    FR_choices = [seq(F_pat, "!", R_pat), seq(R_pat, "!", F_pat)]
     if FR_can_be_m:
-        FR_pat = alt(FR_pat, "m")
+        FR_choices.append("m")
     if FR_can_be_n:
-        FR_pat = alt(FR_pat, "n")
+        FR_choices.append("n")
+    return F_pat, R_pat, alt(*FR_choices)
+
+
+# F and R need special handling.
+for chord, pat in list(right_chord_to_pat.items()):
+    keys = set(chord)
+    F_pat, R_pat, FR_pat = compile_f_and_r(
+        F_prioritize_v=chord == "Z",
+        F_can_be_s=bool(keys.intersection("PBLGT")),
+        R_can_be_l=bool(keys.intersection("PB")),
+        FR_can_be_m=keys.intersection("PBLG") not in [set("PL"), set("BG")],
+        FR_can_be_n=keys.intersection("PBLG") == set("BG"),
+    )
     right_chord_to_pat["F" + chord] = seq(F_pat, "!", right_chord_to_pat[chord])
     # R can appear before or after the rest of the chord.
     right_chord_to_pat["R" + chord] = alt(
@@ -413,24 +565,26 @@ for chord, pat in list(right_chord_to_pat.items()):
 right_chord_to_pat["Z"] = "z"
 
 THREE_VOWELS = {
-    "A": ["ee", "ui"],
-    "O": ["ii", "ue"],
-    "E": ["aa", "uo"],
-    "U": ["oo", "au"],
+    "A": ("ee", "ui"),
+    "O": ("ii", "ue"),
+    "E": ("aa", "uo"),
+    "U": ("oo", "au"),
 }
 
 
-def get_vowel_clusters(middle_chord: str) -> list[str]:
+@functools.lru_cache(maxsize=None)
+def get_vowel_clusters(middle_chord: str) -> tuple[str, ...]:
     if middle_chord == "AOEU":
         # TODO: "oo" can be specified in 2 ways. See if we should remove one.
-        return ["oo"]
+        return ("oo",)
     if len(middle_chord) == 3:
         return THREE_VOWELS[next(iter(set("AOEU").difference(set(middle_chord))))]
     if middle_chord == "OE":
-        return ["u", "oe"]
-    return [middle_chord.replace("U", "i").lower()]
+        return ("u", "oe")
+    return (middle_chord.replace("U", "i").lower(),)
 
 
+@functools.lru_cache(maxsize=None)
 def vowels_to_pat(vowels: str) -> Pat:
     """Compile the given vowels into a pattern. 'i' can also represent 'y'. 'u'
     can also represent 'w' except in the first position.
@@ -444,14 +598,15 @@ def vowels_to_pat(vowels: str) -> Pat:
     return compile_pat(vowels)
 
 
-def compile_vowel_clusters(vcs: list[str]) -> Pat:
+@functools.lru_cache(maxsize=None)
+def compile_vowel_clusters(vcs: tuple[str, ...]) -> Pat:
     """Compile all vowel clusters into one pattern that matches any of them.
 
     A 2-length vowel cluster is considered to represent those vowels in either
     order, plus an optional third vowel. The behavior of vowels_to_pat() is
     also applied.
 
-    >>> compile_vowel_clusters(['ui'])
+    >>> compile_vowel_clusters(('ui',))
     seq(alt(seq('u', alt('i', 'y')), seq(alt('i', 'y'), alt('u', 'w'))),
         alt(seq(), 'W'))
     """
@@ -532,45 +687,70 @@ islands["KW-BGD"] = '{^, "^}{-|}'
 islands["KPW-S"] = "becomes"
 
 
-def untuck_right_vowel(
-    cursors: list[Cursor], vcs: list[str], right_chord: str
-) -> list[Cursor]:
-    """Return cursors representing what would happen if the 'i' in vowel
-    clusters were untucked such that the 'i' appeared after the right pattern.
+@functools.lru_cache(maxsize=None)
+def compile_untuck(vc: str, right_chord: str) -> Pat:
+    """Compile the pat representing what would happen if the 'i' in the given
+    vowel cluster were untucked such that the 'i' appeared after the right
+    pattern.
 
     If the vowel cluster is of length 2, an additional vowel is permitted
     before the right pattern, with an additional score of 1.
 
-    >>> word_list = ['aty', 'auty']
-    >>> cursor = Cursor(word_list, range(len(word_list)))
-    >>> untuck_right_vowel([cursor], ['ai'], 'T')
-    [Cursor(matching_range=range(0, 1), letters_read='aty', score=0),
-     Cursor(matching_range=range(1, 2), letters_read='auty', score=1)]
+    >>> compile_untuck('ai', 'T')
+    seq('a', 'W', 't', alt('i', 'y'))
 
-    >>> word_list = ['ty', 'uty']
-    >>> cursor = Cursor(word_list, range(len(word_list)))
-    >>> untuck_right_vowel([cursor], ['i'], 'T')
-    [Cursor(matching_range=range(0, 1), letters_read='ty', score=0)]
+    >>> cursors = [(build_trie(['aty', 'auty']), 0)]
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, compile_untuck('ai', 'T'))]
+    [('aty', 0), ('auty', 1)]
+
+    >>> cursors = [(build_trie(['ty', 'uty']), 0)]
+    >>> [(n.word, s) for n, s in advance_flatten(cursors, compile_untuck('i', 'T'))]
+    [('ty', 0)]
     """
-    ret = []
-    for vc in vcs:
-        if "i" in vc:
-            to_add = advance_flatten(cursors, vowels_to_pat(vc.replace("i", "", 1)))
-            if len(vc) > 1:
-                to_add = advance_flatten(to_add, "W")
-            to_add = advance_flatten(to_add, right_chord_to_pat[right_chord])
-            to_add = advance_flatten(to_add, vowels_to_pat("i"))
-            ret += to_add
-    return ret
+    elements = [vowels_to_pat(vc.replace("i", "", 1))]
+    if len(vc) > 1:
+        elements.append("W")
+    elements.append(right_chord_to_pat[right_chord])
+    elements.append(vowels_to_pat("i"))
+    return seq(*elements)
+
+
+ChordPats = typing.Tuple[Pat, Pat, typing.Tuple[Pat, ...], typing.Optional[Pat]]
+
+
+@functools.lru_cache(maxsize=None)
+def compile_chord(left: str, middle: str, right: str) -> ChordPats:
+    """Compile the parts of a chord into:
+
+    - the pat for its left bank,
+    - the pat for its vowels followed by its right bank,
+    - the pats for each vowel cluster with an 'i' untucked (see
+      compile_untuck()), which only apply to the last chord of a key, and
+    - the pat for the special case in which the middle is empty and the right
+      chord is only G, or None if that does not apply.
 
+    Chords recur across lookups, so the pats are only built once per chord.
+    Advancing by them is memoized, like any other pat.
 
-def handle_ing(cursors: list[Cursor], vcs: list[str], right_chord: str) -> list[Cursor]:
-    """Handle the special case in which the middle is empty and the right chord
-    is only G.
+    >>> compile_chord('HR', 'O', 'B')
+    ('l', seq('o', 'b'), (), None)
+
+    >>> compile_chord('K', '', 'G')
+    (alt('k', 'c', 'g'), alt(seq('g', alt(seq(), 'h')), 'h'), (), seq('i', 'n', 'g'))
+
+    >>> compile_chord('HR', 'O', 'X')
+    Traceback (most recent call last):
+        ...
+    KeyError: 'X'
     """
-    if vcs != [""] or right_chord != "G":
-        return []
-    return advance_flatten(cursors, seq("i", "n", "g"))
+    vcs = get_vowel_clusters(middle)
+    right_pat = right_chord_to_pat[right]
+    return (
+        left_chord_to_pat[left],
+        seq(compile_vowel_clusters(vcs), right_pat),
+        tuple(compile_untuck(vc, right) for vc in vcs if "i" in vc),
+        seq("i", "n", "g") if not middle and right == "G" else None,
+    )
 
 
 fragments = {}
@@ -579,11 +759,127 @@ fragments["KWR-R"] = "your"
 fragments["KWR-RS"] = "yours"
 fragments["W"] = "with"
 
-WORDS = []
 with open("/home/jonathan/words") as f:
-    for rawline in f:
-        if m := re.match("([a-z]+)$", rawline):
-            WORDS.append(m.group(1))
+    # Only use lines that are entirely lowercase letters. The trie keeps each
+    # word in its node, so there is no need to keep a separate list of them.
+    # The trie is not free: for a word list of about 236,000 lines, it makes
+    # loading take about 1.3s instead of 0.3s, and the process RSS about 160 MB
+    # instead of 30 MB. Memoized advances add about 70 MB more after 30,000
+    # lookups, up to the limit on _advance_memo.
+    WORD_TRIE = build_trie(re.findall("(?m)^[a-z]+$", f.read()))
+
+
+def split_chord(chord: str) -> tuple[str, str, str]:
+    """Split a chord into its left bank, vowels, and right bank. The vowels
+    may be empty only if the chord is entirely on the left bank.
+
+    >>> split_chord('TKUFRPBT')
+    ('TK', 'U', 'FRPBT')
+    >>> split_chord('TK-P')
+    ('TK', '', 'P')
+    >>> split_chord('SKWR')
+    ('SKWR', '', '')
+    >>> split_chord('SKWRG')
+    Traceback (most recent call last):
+        ...
+    KeyError: 'SKWRG'
+    """
+    # Each bank is a run of keys from its own set, so strip runs instead of
+    # matching a regex.
+    rest = chord.lstrip("+STKPWHR")
+    left = chord[: len(chord) - len(rest)]
+    right = rest.lstrip("AOEU-")
+    middle = rest[: len(rest) - len(right)]
+    if right.lstrip("FRPBLGTSDZ") or not (middle or left and not right):
+        raise KeyError(chord)
+    return left, middle.replace("-", ""), right
+
+
+def advance_chord(
+    cursors: typing.Sequence[Cursor],
+    inhibit_vowel_insertion: bool,
+    chord: str,
+    first: bool,
+    last: bool,
+) -> tuple[typing.Sequence[Cursor], bool]:
+    """Advance the cursors by one chord of a key, returning the new cursors and
+    whether vowel insertion is inhibited before the next chord.
+
+    If inhibit_vowel_insertion is False, a ! will be inserted if the syllable
+    does not start with a vowel.
+    """
+    if chord in fragments:
+        # Fragments always allow vowel insertion.
+        if not inhibit_vowel_insertion:
+            cursors = dedup_cursors(advance_flatten(cursors, "!"))
+        return cursors, False
+    if chord in islands:
+        # Islands can only be used alone, which lookup() handles.
+        raise KeyError
+    left, middle, right = split_chord(chord)
+    if not left and middle and right and not first:
+        # Vowel and Right must start word
+        raise KeyError
+    if "+" in left and left != "+" and not first:
+        # + and anything else in Left must start word
+        raise KeyError
+    left_pat, vowels_and_right_pat, untuck_pats, ing_pat = compile_chord(
+        left, middle, right
+    )
+    if not inhibit_vowel_insertion and (left or not middle):
+        left_pat = seq("!", left_pat)
+    cursors = dedup_cursors(advance_flatten(cursors, left_pat))
+    # The untucked and "ing" cursors are appended after all the others, rather
+    # than alternated per cursor, so that they lose ties between words.
+    new_cursors = advance_flatten(cursors, vowels_and_right_pat)
+    if last:
+        for untuck_pat in untuck_pats:
+            new_cursors += advance_flatten(cursors, untuck_pat)
+    if ing_pat is not None:
+        new_cursors += advance_flatten(cursors, ing_pat)
+    return dedup_cursors(new_cursors), bool(middle and not right)
+
+
+@functools.lru_cache(maxsize=1024)
+def _advance_key_prefix(prefix: tuple[str, ...]) -> tuple[tuple[Cursor, ...], bool]:
+    """Advance through the given chords, which do not end the key, as
+    advance_chord() does. An invalid prefix results in no cursors.
+
+    Keys that Plover looks up often share prefixes (for example, when the key
+    is being extended by one chord at a time), so this is cached per prefix.
+    The cursors are returned as a tuple, since they are shared by every caller.
+    """
+    if not prefix:
+        return ((WORD_TRIE, 0),), True
+    cursors, inhibit_vowel_insertion = _advance_key_prefix(prefix[:-1])
+    if not cursors:
+        return cursors, inhibit_vowel_insertion
+    try:
+        new_cursors, inhibit_vowel_insertion = advance_chord(
+            cursors, inhibit_vowel_insertion, prefix[-1], len(prefix) == 1, False
+        )
+    except KeyError:
+        return (), inhibit_vowel_insertion
+    return tuple(new_cursors), inhibit_vowel_insertion
+
+
+@functools.lru_cache(maxsize=8192)
+def _lookup_tuple(key: tuple[str, ...]) -> typing.Optional[str]:
+    """Return the word for the given key, or None if there is none. Misses are
+    cached too, since most keys that Plover looks up are not words.
+    """
+    if len(key) == 1 and key[0] in islands:
+        return islands[key[0]]
+    cursors, inhibit_vowel_insertion = _advance_key_prefix(key[:-1])
+    if key and cursors:
+        try:
+            cursors, _ = advance_chord(
+                cursors, inhibit_vowel_insertion, key[-1], len(key) == 1, True
+            )
+        except KeyError:
+            return None
+    cursors = advance_flatten(cursors, "E")
+    return get_word(cursors)
 
 
 def lookup(key):
@@ -594,58 +890,11 @@ def lookup(key):
     'plover'
     >>> lookup(['TKUFRPBT'])
     'different'
+    >>> lookup(['^'])
+    ''
     """
-    cursors = [Cursor(WORDS, range(len(WORDS)))]
-    inhibit_vowel_insertion = True
-    """If False, a ! will be inserted if the syllable does not start with a
-    vowel.
-    """
-    for i, k in enumerate(key):
-        if k in fragments:
-            # Fragments always allow vowel insertion.
-            if not inhibit_vowel_insertion:
-                cursors = advance_flatten(cursors, "!")
-            inhibit_vowel_insertion = False
-            continue
-        if k in islands:
-            if len(key) == 1:
-                return islands[k]
-            raise KeyError
-        if match := re.match("[+STKPWHR]+$", k):
-            left = match.group(0)
-            middle = ""
-            right = ""
-        elif match := re.match("([+STKPWHR]*)([AOEU-]+)([FRPBLGTSDZ]*)$", k):
-            left = match.group(1)
-            middle = match.group(2).replace("-", "")
-            right = match.group(3)
-        else:
-            raise KeyError
-        if not left and middle and right and i:
-            # Vowel and Right must start word
-            raise KeyError
-        if "+" in left and left != "+" and i:
-            # + and anything else in Left must start word
-            raise KeyError
-        if not inhibit_vowel_insertion and (left or not middle):
-            cursors = advance_flatten(cursors, "!")
-        cursors = advance_flatten(cursors, left_chord_to_pat[left])
-        vcs = get_vowel_clusters(middle)
-        cursors = (
-            advance_flatten(
-                cursors, seq(compile_vowel_clusters(vcs), right_chord_to_pat[right])
-            )
-            + (untuck_right_vowel(cursors, vcs, right) if i == len(key) - 1 else [])
-            + (
-                advance_flatten(cursors, seq("i", "n", "g"))
-                if not middle and right == "G"
-                else []
-            )
-        )
-        inhibit_vowel_insertion = middle and not right
-    cursors = advance_flatten(cursors, "E")
-    word = get_word(cursors)
-    if not word:
+    word = _lookup_tuple(tuple(key))
+    if word is None:
         raise KeyError
     return word
 